@@ -1,15 +1,42 @@
 """
 MongoDB database module for tracking posted games.
 """
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import PyMongoError, DuplicateKeyError
 import os
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Expired promotions are rolled up into game_summaries on each run. The TTL index is
+# a safety net that removes anything compaction missed after this many seconds.
+POSTED_GAMES_TTL_SECONDS = 30 * 24 * 3600
+GAME_EVENTS_TTL_SECONDS = 180 * 24 * 3600
+COMPACT_BATCH_SIZE = 500
+# Keep dedupe records this long after a promotion ends, so a cached source response
+# that still lists a just-expired offer does not repost it.
+COMPACT_GRACE = timedelta(days=2)
+
+
+def to_datetime(valid_until: Union[str, datetime, None]) -> Optional[datetime]:
+    """Convert a promotion end time to a naive UTC datetime (as stored by pymongo).
+
+    Accepts ISO8601 strings (with or without offset/'Z'), datetimes or empty values.
+    Returns None when there is no (parsable) end time.
+    """
+    if not valid_until:
+        return None
+    if isinstance(valid_until, str):
+        try:
+            valid_until = datetime.fromisoformat(valid_until.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if valid_until.tzinfo is not None:
+        valid_until = valid_until.astimezone(timezone.utc).replace(tzinfo=None)
+    return valid_until
+
 class MongoDBError(Exception):
     """Custom exception for MongoDB related errors."""
     pass
@@ -40,12 +67,13 @@ class MongoDB:
 
     """MongoDB wrapper for tracking posted games."""
     
-    def __init__(self, connection_string: str = None, db_name: str = "epic_games"):
+    def __init__(self, connection_string: str = None, db_name: str = "epic_games", auto_migrate: bool = True):
         """Initialize MongoDB connection.
         
         Args:
             connection_string: MongoDB connection string. If None, will try to get from MONGODB_URI env var.
             db_name: Database name to use.
+            auto_migrate: Run migrate_valid_until() if string valid_until values are found.
         """
         self.connection_string = connection_string or os.getenv('MONGODB_URI')
         if not self.connection_string:
@@ -57,42 +85,70 @@ class MongoDB:
             self.client.server_info()
             self.db = self.client[db_name]
             self.posted_games = self.db.posted_games
+            self.game_summaries = self.db.game_summaries
             # Create a unique compound index on (game_id, valid_until, service)
             self.posted_games.create_index([
                 ('game_id', 1),
                 ('valid_until', 1),
                 ('service', 1)
             ], unique=True)
+            self.db.game_events.create_index('event_time', expireAfterSeconds=GAME_EVENTS_TTL_SECONDS)
+            self.game_summaries.create_index([('game_id', 1), ('service', 1)], unique=True)
         except Exception as e:
             raise MongoDBError(f"Failed to connect to MongoDB: {str(e)}")
+
+        # Databases created before valid_until was stored as a date would otherwise
+        # miss every dedupe lookup and repost all live promotions.
+        try:
+            needs_migration = self.posted_games.find_one({"valid_until": {"$type": "string"}}, {"_id": 1})
+        except PyMongoError as e:
+            raise MongoDBError(f"Error checking for string valid_until: {str(e)}")
+        if needs_migration and auto_migrate:
+            self.migrate_valid_until()
+        elif not needs_migration:
+            self._create_posted_games_ttl_index()
+
+    def _create_posted_games_ttl_index(self):
+        """Create the TTL safety net on posted_games.valid_until.
+
+        TTL indexes only expire documents whose field is a date, so promotions without an
+        end time are kept for deduplication. The index is only created once no string
+        values remain, so migrated promotions are compacted before the TTL monitor sees them.
+        """
+        try:
+            self.posted_games.create_index('valid_until', expireAfterSeconds=POSTED_GAMES_TTL_SECONDS)
+        except PyMongoError as e:
+            raise MongoDBError(f"Error creating TTL index: {str(e)}")
     
-    def is_game_posted(self, game_id: str, valid_until: str, service: str) -> bool:
+    def is_game_posted(self, game_id: str, valid_until: Union[str, datetime], service: str) -> bool:
         """Check if a game has been posted for a specific promotion period.
         
         Args:
             game_id: The unique identifier of the game.
-            valid_until: The promotion end time (ISO8601 string).
+            valid_until: The promotion end time (ISO8601 string or datetime).
             service: The service to check (e.g., 'discord').
         Returns:
             bool: True if the game has been posted for this promotion period, False otherwise.
         """
+        valid_until = to_datetime(valid_until)
         try:
             logger.debug(f"Checking if game {game_id} with valid_until {valid_until} has been posted to {service}")
             return bool(self.posted_games.find_one({"game_id": game_id, "valid_until": valid_until, "service": service}))
         except PyMongoError as e:
             raise MongoDBError(f"Error checking if game is posted: {str(e)}")
     
-    def mark_game_as_posted(self, game_id: str, title: str, valid_until: str, service: str, original_price: float = None, discount_price: float = None) -> None:
+    def mark_game_as_posted(self, game_id: str, title: str, valid_until: Union[str, datetime], service: str, original_price: float = None, discount_price: float = None) -> None:
         """Mark a game as posted for a specific promotion period, including price info.
         
         Args:
             game_id: The unique identifier of the game.
             title: The title of the game.
-            valid_until: The promotion end time (ISO8601 string).
+            valid_until: The promotion end time (ISO8601 string or datetime).
             service: The service where the game was posted (e.g., 'discord').
             original_price: The original price of the game (optional).
             discount_price: The discounted price of the game (optional).
         """
+        valid_until = to_datetime(valid_until)
         try:
             set_fields = {
                 "title": title,
@@ -118,14 +174,119 @@ class MongoDB:
         except PyMongoError as e:
             raise MongoDBError(f"Error marking game as posted: {str(e)}")
     
+    def compact_expired(self, now: datetime = None) -> int:
+        """Roll expired promotions up into game_summaries and delete them.
+
+        Each (game_id, service) pair keeps one summary document with the number of
+        promotions posted, first/last post times, the latest end time and the lowest
+        price seen, so history survives while posted_games only holds live promotions.
+
+        Summaries remember the most recently compacted ids, so a run that fails between
+        updating summaries and deleting the expired documents does not count them twice.
+
+        Args:
+            now: Current time (naive UTC). Defaults to now. Promotions that ended more
+                than COMPACT_GRACE before it are compacted.
+        Returns:
+            int: Number of posted_games documents removed.
+        """
+        cutoff = (now or datetime.utcnow()) - COMPACT_GRACE
+        removed = 0
+        try:
+            while True:
+                expired = list(self.posted_games.find(
+                    {"valid_until": {"$type": "date", "$lt": cutoff}}
+                ).limit(COMPACT_BATCH_SIZE))
+                if not expired:
+                    break
+
+                # Make sure every summary exists, so the guarded updates below need no upsert
+                self.game_summaries.bulk_write([
+                    UpdateOne(
+                        {"game_id": key[0], "service": key[1]},
+                        {"$setOnInsert": {"promotions": 0, "compacted_ids": []}},
+                        upsert=True
+                    ) for key in {(doc["game_id"], doc["service"]) for doc in expired}
+                ], ordered=False)
+
+                updates = []
+                for doc in expired:
+                    update = {
+                        "$set": {"title": doc.get("title", "")},
+                        "$inc": {"promotions": 1},
+                        "$max": {"last_valid_until": doc["valid_until"]},
+                        "$min": {},
+                        "$push": {"compacted_ids": {"$each": [doc["_id"]], "$slice": -COMPACT_BATCH_SIZE}},
+                    }
+                    first_posted = doc.get("first_posted") or doc.get("posted_at")
+                    if first_posted is not None:
+                        update["$min"]["first_posted"] = first_posted
+                    if doc.get("posted_at") is not None:
+                        update["$max"]["last_posted"] = doc["posted_at"]
+                    if doc.get("discount_price") is not None:
+                        update["$min"]["lowest_price"] = doc["discount_price"]
+                    if doc.get("original_price") is not None:
+                        update["$max"]["original_price"] = doc["original_price"]
+                    if not update["$min"]:
+                        del update["$min"]
+                    updates.append(UpdateOne(
+                        {"game_id": doc["game_id"], "service": doc["service"], "compacted_ids": {"$ne": doc["_id"]}},
+                        update
+                    ))
+                self.game_summaries.bulk_write(updates, ordered=False)
+                result = self.posted_games.delete_many({"_id": {"$in": [doc["_id"] for doc in expired]}})
+                removed += result.deleted_count
+        except PyMongoError as e:
+            raise MongoDBError(f"Error compacting posted games: {str(e)}")
+        if removed:
+            logger.info(f"Compacted {removed} expired posted games into summaries")
+        return removed
+
+    def migrate_valid_until(self) -> int:
+        """One-time migration converting string valid_until values to datetimes.
+
+        Empty strings become null. If a converted document collides with an existing
+        one for the same promotion, the string copy is dropped. Expired promotions are
+        then compacted before the posted_games TTL index is created, so the TTL monitor
+        cannot delete migrated history before it is rolled into game_summaries.
+
+        Returns:
+            int: Number of documents converted or dropped.
+        """
+        migrated = 0
+        try:
+            for doc in self.posted_games.find({"valid_until": {"$type": "string"}}):
+                try:
+                    self.posted_games.update_one(
+                        {"_id": doc["_id"]},
+                        {"$set": {"valid_until": to_datetime(doc["valid_until"])}}
+                    )
+                except DuplicateKeyError:
+                    self.posted_games.delete_one({"_id": doc["_id"]})
+                migrated += 1
+        except PyMongoError as e:
+            raise MongoDBError(f"Error migrating valid_until: {str(e)}")
+        logger.info(f"Migrated {migrated} posted games to datetime valid_until")
+        self.compact_expired()
+        self._create_posted_games_ttl_index()
+        return migrated
+
     def close(self):
         """Close the MongoDB connection."""
         self.client.close()
 
-# Singleton instance
-db = None
-try:
-    db = MongoDB()
-except MongoDBError as e:
-    print(f"Warning: {str(e)}")
-    db = None
+
+if __name__ == "__main__":
+    import sys
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    db = MongoDB(auto_migrate=command != "migrate")
+    if command == "migrate":
+        print("Migrated", db.migrate_valid_until(), "documents")
+    elif command == "compact":
+        print("Compacted", db.compact_expired(), "documents")
+    else:
+        print("Usage: python -m databases.mongodb [migrate|compact]")
+    db.close()
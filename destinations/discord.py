@@ -1,4 +1,4 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import requests
 from datetime import datetime
 from models.game import Game
@@ -6,9 +6,29 @@ from models.game import Game
 AVATAR_FREE="https://raw.githubusercontent.com/Voxar/GamePromotions/main/assets/avatars/free/1.png"
 AVATAR_DISCOUNTED="https://raw.githubusercontent.com/Voxar/GamePromotions/main/assets/avatars/discounted/1.png"
 
+# Discord limits, see https://discord.com/developers/docs/resources/message#embed-object-embed-limits
+MAX_EMBEDS = 10
+MAX_FIELDS = 25
+MAX_FIELD_NAME = 256
+MAX_FIELD_VALUE = 1024
+MAX_EMBED_CHARS = 6000
+
 class DiscordWebhookError(Exception):
     pass
 
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+def _offer_ends(game: Game) -> Optional[str]:
+    """Return a Discord relative timestamp for when the offer ends, if known."""
+    if hasattr(game, 'valid_until') and game.valid_until:
+        try:
+            end_date = datetime.fromisoformat(game.valid_until.rstrip('Z'))
+            return f"<t:{int(end_date.timestamp())}:R>"
+        except (ValueError, AttributeError):
+            pass
+    return None
+
 def create_embed(game: Game) -> Dict[str, Any]:
     """Create a Discord embed for a single game."""
     
@@ -34,12 +54,9 @@ def create_embed(game: Game) -> Dict[str, Any]:
     embed["fields"].append({"name": "Store", "value": game.store, "inline": True})
     
     # Add valid until if available
-    if hasattr(game, 'valid_until') and game.valid_until:
-        try:
-            end_date = datetime.fromisoformat(game.valid_until.rstrip('Z'))
-            embed["fields"].append({"name": "Offer ends", "value": f"<t:{int(end_date.timestamp())}:R>", "inline": True})
-        except (ValueError, AttributeError):
-            pass
+    ends = _offer_ends(game)
+    if ends:
+        embed["fields"].append({"name": "Offer ends", "value": ends, "inline": True})
     
     # Add image if available
     if hasattr(game, 'image_url') and game.image_url:
@@ -47,19 +64,111 @@ def create_embed(game: Game) -> Dict[str, Any]:
     
     return embed
 
-def send_to_discord_webhook(webhook_url: str, games: List[Game]) -> bool:
+def create_digest_field(game: Game) -> Dict[str, Any]:
+    """Create a compact one-line embed field for a game in a digest."""
+    if game.is_free:
+        price = "**Free**"
+    else:
+        price = f"**{game.price_with_currency}** ~~{game.currency_symbol}{game.original_price:.2f}~~ -{game.discount_percentage:.0f}%"
+    parts = [price, game.store]
+    ends = _offer_ends(game)
+    if ends:
+        parts.append(f"ends {ends}")
+    parts.append(f"[Store page]({game.url})")
+    return {
+        "name": _truncate(game.title or "Untitled", MAX_FIELD_NAME),
+        "value": _truncate(" · ".join(parts), MAX_FIELD_VALUE),
+        "inline": False,
+    }
+
+def _field_size(field: Dict[str, Any]) -> int:
+    return len(field["name"]) + len(field["value"])
+
+def create_digest_embeds(games: List[Game], top: int = None) -> Tuple[List[Dict[str, Any]], List[Game]]:
+    """
+    Render games into digest embeds: one embed for free games and one for discounted games.
+
+    Free games come first, discounted games are sorted by discount. At most `top` games are
+    included, and games that do not fit Discord's field and size limits are summarized as
+    a count in the embed footer.
+
+    Returns:
+        Tuple of (embeds, the games that were actually rendered)
+    """
+    free_games = [game for game in games if game.is_free]
+    discounted_games = sorted((game for game in games if game.is_discounted),
+                              key=lambda game: game.discount_percentage, reverse=True)
+    selected = (free_games + discounted_games)[:top] if top else free_games + discounted_games
+
+    groups = [
+        ("Free Games", 0x57F287, [game for game in selected if game.is_free]),
+        ("Discount Games", 0x5865F2, [game for game in selected if not game.is_free]),
+    ]
+    total = len(games)
+    budget = MAX_EMBED_CHARS
+    embeds = []
+    rendered = []
+    for title, color, group in groups:
+        if not group:
+            continue
+        # Reserve room for the title and a footer
+        budget -= len(title) + 64
+        fields = []
+        for game in group:
+            field = create_digest_field(game)
+            if len(fields) >= MAX_FIELDS or _field_size(field) > budget:
+                break
+            budget -= _field_size(field)
+            fields.append(field)
+            rendered.append(game)
+        embed = {"title": title, "color": color, "fields": fields}
+        if len(fields) < len(group):
+            embed["footer"] = {"text": f"…and {len(group) - len(fields)} more"}
+        embeds.append(embed)
+    if embeds and len(selected) < total:
+        footer = embeds[-1].setdefault("footer", {"text": ""})
+        footer["text"] = (footer["text"] + f" (top {len(selected)} of {total})").strip()
+    return embeds, rendered
+
+def send_digest_to_discord_webhook(webhook_url: str, games: List[Game], top: int = None) -> List[Game]:
+    """
+    Send a list of games to a Discord webhook as a single digest message.
+
+    Args:
+        webhook_url: The Discord webhook URL
+        games: A list of Game objects containing the games to send
+        top: Only include the top N games (free first, then by discount)
+
+    Returns:
+        List[Game]: The games included in the message; games cut by `top` or Discord's
+        size limits are left out so they can be posted later
+    """
+    if not webhook_url:
+        raise ValueError("Webhook URL is required")
+    embeds, rendered = create_digest_embeds(games, top)
+    avatar = AVATAR_FREE if any(game.is_free for game in rendered) else AVATAR_DISCOUNTED
+    if not send(webhook_url, embeds, "Game Promotions", avatar):
+        return []
+    return rendered
+
+def send_to_discord_webhook(webhook_url: str, games: List[Game], digest: bool = False, top: int = None) -> List[Game]:
     """
     Send a list of games to a Discord webhook.
     
     Args:
         webhook_url: The Discord webhook URL
         games: A list of Game objects containing the games to send
+        digest: Send all games as one compact message instead of one embed per game
+        top: In digest mode, only include the top N games
         
     Returns:
-        bool: True if the message was sent successfully, False otherwise
+        List[Game]: The games that were sent
     """
     if not webhook_url:
         raise ValueError("Webhook URL is required")
+
+    if digest:
+        return send_digest_to_discord_webhook(webhook_url, games, top)
     
     # Split games into free and discounted
     free_games = [game for game in games if game.is_free]
@@ -67,19 +176,19 @@ def send_to_discord_webhook(webhook_url: str, games: List[Game]) -> bool:
             
     send(webhook_url, [create_embed(game) for game in discounted_games], "Discount Games")
     send(webhook_url, [create_embed(game) for game in free_games], "Free Games")
-    return True
+    return discounted_games + free_games
             
-def send(webhook_url, embeds, username):
+def send(webhook_url, embeds, username, avatar_url=None):
     # If no games, don't send anything
     if not embeds:
         return False
     
     # Split embeds into chunks of 10 (Discord's limit per message)
-    for i in range(0, len(embeds), 10):
-        chunk = embeds[i:i + 10]
+    for i in range(0, len(embeds), MAX_EMBEDS):
+        chunk = embeds[i:i + MAX_EMBEDS]
         payload = {
             "username": username,
-            "avatar_url": AVATAR_FREE if "Free" in username else AVATAR_DISCOUNTED,
+            "avatar_url": avatar_url or (AVATAR_FREE if "Free" in username else AVATAR_DISCOUNTED),
             "embeds": chunk,
         }
         
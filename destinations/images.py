@@ -0,0 +1,124 @@
+"""
+Image validation for game thumbnails, run before delivery.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ImageValidationCache:
+    """
+    Persistent cache of image URL HEAD checks.
+
+    Results are stored as {url: [ok, checked_at]} in a JSON file and reused until they
+    are older than ttl seconds (failure_ttl for broken images), so each run only checks
+    URLs it has not seen recently. Network errors, timeouts, 429 and 5xx responses say
+    nothing about the image and are neither cached nor treated as broken.
+    """
+
+    def __init__(self, path: str = None, ttl: int = 7 * 24 * 3600, failure_ttl: int = 6 * 3600,
+                 max_workers: int = 8, timeout: float = 5.0):
+        self.path = path or os.getenv("IMAGE_CACHE_PATH") or ".image_cache.json"
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.entries: Dict[str, list] = {}
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _expired(self, entry: list, now: float) -> bool:
+        return now - entry[1] >= (self.ttl if entry[0] else self.failure_ttl)
+
+    def _fresh(self, url: str, now: float) -> Optional[bool]:
+        entry = self.entries.get(url)
+        if entry and not self._expired(entry, now):
+            return entry[0]
+        return None
+
+    def _check(self, url: str) -> Optional[bool]:
+        """Return True/False for a working/broken image, or None if it could not be determined."""
+        import requests
+        try:
+            response = requests.head(url, allow_redirects=True, timeout=self.timeout)
+            if response.status_code in (405, 501):
+                # Some CDNs reject HEAD; fetch a single byte instead
+                response = requests.get(url, headers={"Range": "bytes=0-0"}, allow_redirects=True,
+                                        timeout=self.timeout, stream=True)
+                response.close()
+        except requests.RequestException:
+            return None
+        if response.status_code == 429 or response.status_code >= 500:
+            return None
+        content_type = response.headers.get("Content-Type", "")
+        return response.ok and (not content_type or content_type.startswith("image/"))
+
+    def check_all(self, urls: Iterable[str]) -> Dict[str, Optional[bool]]:
+        """Return {url: ok} for the given URLs, checking only those not cached.
+
+        ok is None when a URL could not be checked (e.g. network error); such results are not cached.
+        """
+        now = time.time()
+        results = {}
+        pending = []
+        for url in set(urls):
+            ok = self._fresh(url, now)
+            if ok is None:
+                pending.append(url)
+            else:
+                results[url] = ok
+        if pending:
+            logger.debug(f"Checking {len(pending)} image URLs")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for url, ok in zip(pending, executor.map(self._check, pending)):
+                    if ok is not None:
+                        self.entries[url] = [ok, now]
+                    results[url] = ok
+        return results
+
+    def validate_games(self, games: Iterable) -> None:
+        """
+        Replace broken image URLs on games before delivery.
+
+        Each game's image_url is checked first, then its image_candidates in order.
+        Checks are batched per round so every round runs with bounded concurrency.
+        A URL that could not be checked is kept as is. Games whose images are all
+        broken get an empty image_url.
+        """
+        remaining = {id(game): (game, [game.image_url] + [
+            url for url in getattr(game, 'image_candidates', []) if url != game.image_url
+        ]) for game in games if game.image_url}
+        while remaining:
+            results = self.check_all(candidates[0] for _, candidates in remaining.values())
+            for key, (game, candidates) in list(remaining.items()):
+                url = candidates.pop(0)
+                if results[url] is not False:
+                    if url != game.image_url:
+                        logger.info(f"Replacing broken image for {game.title}: {game.image_url} -> {url}")
+                    game.image_url = url
+                    del remaining[key]
+                elif not candidates:
+                    logger.info(f"No working image for {game.title}")
+                    game.image_url = ''
+                    del remaining[key]
+        self.save()
+
+    def save(self):
+        """Write the cache to disk, dropping expired entries."""
+        now = time.time()
+        self.entries = {url: entry for url, entry in self.entries.items() if not self._expired(entry, now)}
+        try:
+            with open(self.path, "w") as f:
+                json.dump(self.entries, f)
+        except OSError as e:
+            logger.warning(f"Could not write image cache {self.path}: {e}")
@@ -1,112 +1,305 @@
 import os
-from dotenv import load_dotenv
-import sentry_sdk
-from sentry_sdk.crons import monitor
-
-load_dotenv()
-
-sentry_sdk.init(
-    dsn=os.getenv("SENTRY_DSN"),
-    # Add data like request headers and IP for users,
-    # see https://docs.sentry.io/platforms/python/data-management/data-collected/ for more info
-    send_default_pii=True,
-    enable_logs=True,
-    enable_tracing=True,
-    enable_db_query_source=True,
-    
-    # Set traces_sample_rate to 1.0 to capture 100%
-    # of transactions for tracing.
-    traces_sample_rate=1.0,
-    # To collect profiles for all profile sessions,
-    # set `profile_session_sample_rate` to 1.0.
-    profile_session_sample_rate=1.0,
-    # Profiles will be automatically collected while
-    # there is an active span.
-    profile_lifecycle="trace",
-)
+import sys
+import argparse
+import contextlib
+import itertools
+import json
+import logging
 
+import registry
 from models.games import Games
-import logging
 
-@monitor(monitor_slug='gha-gamepromotions')
-def main():
-    discord_webhooks = [e for e in (os.getenv("DISCORD_WEBHOOK_URL") or "").split(";") if len(e) > 0]
-    epic_games_url = os.getenv("EPIC_GAMES_PROMOTIONS")
-    steam_games_url = os.getenv("STEAM_PROMOTIONS")
+logger = logging.getLogger(__name__)
+
+# Top-level imports of main plus the enabled modules should stay under this (milliseconds)
+DEFAULT_STARTUP_BUDGET_MS = 500
+
+
+def init_sentry():
+    """Initialize Sentry if SENTRY_DSN is set. Returns True when Sentry is active."""
+    if not os.getenv("SENTRY_DSN"):
+        return False
+
+    import sentry_sdk
+    sentry_sdk.init(
+        dsn=os.getenv("SENTRY_DSN"),
+        # Add data like request headers and IP for users,
+        # see https://docs.sentry.io/platforms/python/data-management/data-collected/ for more info
+        send_default_pii=True,
+        enable_logs=True,
+        enable_tracing=True,
+        enable_db_query_source=True,
+
+        # Set traces_sample_rate to 1.0 to capture 100%
+        # of transactions for tracing.
+        traces_sample_rate=1.0,
+        # To collect profiles for all profile sessions,
+        # set `profile_session_sample_rate` to 1.0.
+        profile_session_sample_rate=1.0,
+        # Profiles will be automatically collected while
+        # there is an active span.
+        profile_lifecycle="trace",
+    )
+    return True
+
+
+def cron_monitor(enabled: bool):
+    """Sentry cron monitor when Sentry is active, otherwise a no-op."""
+    if not enabled:
+        return contextlib.nullcontext()
+    from sentry_sdk.crons import monitor
+    return monitor(monitor_slug='gha-gamepromotions')
+
+
+def parse_import_times(stderr: str):
+    """
+    Parse `python -X importtime` output.
+
+    Returns:
+        Tuple of (total top-level cumulative microseconds, list of (cumulative_us, module))
+    """
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        cumulative = int(cumulative_us)
+        # Nesting is shown as two extra spaces of indentation per level
+        name = name[1:]
+        if not name.startswith(" "):
+            # Top-level imports; nested ones are already included in their parent's cumulative time
+            total += cumulative
+        modules.append((cumulative, name.strip()))
+    return total, modules
+
+
+def startup_report(budget_ms: float = None, top: int = 15, sources=None) -> int:
+    """
+    Print an import-time report for main and everything the current config enables.
+
+    Runs a fresh interpreter with `-X importtime` so the numbers reflect a cold start.
+    Returns a non-zero exit code if the total exceeds budget_ms.
+    """
+    import subprocess
+
+    code = "import main, registry; registry.import_enabled(%r)" % (sources,)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+
+    total, modules = parse_import_times(result.stderr)
+    modules.sort(reverse=True)
+    print(f"{'cumulative [ms]':>16}  module")
+    for cumulative, name in modules[:top]:
+        print(f"{cumulative / 1000:>16.1f}  {name}")
+    print(f"Total import time: {total / 1000:.1f} ms")
+
+    if budget_ms is not None and total / 1000 > budget_ms:
+        print(f"Startup budget exceeded: {total / 1000:.1f} ms > {budget_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+FALSE_VALUES = ("", "0", "false", "no", "off")
+
+
+def non_negative_int(value: str) -> int:
+    """argparse type for counts that must be 0 or more."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more: {value}")
+    return number
+
+
+def apply_env_defaults(parser, args):
+    """Fill options not given on the command line from their environment variables.
+
+    Flags accept the usual true/false strings; bad values are reported with parser.error.
+    """
+    for dest, env in (("digest", "DISCORD_DIGEST"), ("validate_images", "VALIDATE_IMAGES")):
+        if getattr(args, dest) is None:
+            value = (os.getenv(env) or "").strip().lower()
+            if value not in TRUE_VALUES + FALSE_VALUES:
+                parser.error(f"{env} must be one of {', '.join(v for v in TRUE_VALUES + FALSE_VALUES if v)}: {value!r}")
+            setattr(args, dest, value in TRUE_VALUES)
+    if args.top is None and os.getenv("DISCORD_DIGEST_TOP"):
+        try:
+            args.top = non_negative_int(os.getenv("DISCORD_DIGEST_TOP"))
+        except argparse.ArgumentTypeError as e:
+            parser.error(f"DISCORD_DIGEST_TOP {e}")
+    return args
+
+
+def source_names(value: str):
+    """argparse type for --sources: comma-separated names from registry.SOURCES."""
+    names = [e for e in value.split(",") if e]
+    unknown = [name for name in names if name not in registry.SOURCES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown source(s): {', '.join(unknown)} (available: {', '.join(registry.SOURCES)})")
+    return names
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find game promotions and post them.")
+    parser.add_argument("--sources", type=source_names,
+                        help=f"Comma-separated sources to load (available: {', '.join(registry.SOURCES)})")
+    parser.add_argument("--limit", type=non_negative_int,
+                        help="Stop after loading this many games across all sources")
+    parser.add_argument("--output", choices=["text", "ndjson"], default="text",
+                        help="text: print, dedupe and post to destinations (default); "
+                             "ndjson: stream one JSON record per game to stdout and exit")
+    parser.add_argument("--digest", action="store_true", default=None,
+                        help="Send one compact digest message per webhook instead of one embed per game "
+                             "(or set DISCORD_DIGEST)")
+    parser.add_argument("--top", type=non_negative_int,
+                        help="With --digest, only include the top N games; 0 means all (or set DISCORD_DIGEST_TOP)")
+    parser.add_argument("--validate-images", action="store_true", default=None,
+                        help="HEAD-check image URLs before delivery and replace broken ones "
+                             "(or set VALIDATE_IMAGES; results are cached in IMAGE_CACHE_PATH)")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print an import-time report for the current configuration and exit")
+    parser.add_argument("--startup-budget", type=float, nargs="?", const=DEFAULT_STARTUP_BUDGET_MS,
+                        help=f"With --startup-report, fail if imports take longer than this many ms "
+                             f"(default {DEFAULT_STARTUP_BUDGET_MS})")
+    args = parser.parse_args(argv)
+    # Delivery settings only matter when posting; ndjson and the startup report ignore them
+    if args.output == "text" and not args.startup_report:
+        apply_env_defaults(parser, args)
+    return args
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    args = parse_args(argv)
+    if args.startup_report:
+        return startup_report(args.startup_budget, sources=args.sources)
+
+    sentry = init_sentry()
+    if args.output == "ndjson":
+        # Ad-hoc piping must not check in to the scheduled run's cron monitor
+        return stream(args)
+    with cron_monitor(sentry):
+        return run(args)
+
+
+def iter_games(args):
+    """Yield games from the enabled sources as they are parsed, up to args.limit."""
+    def games():
+        for name, source in registry.enabled_sources(args.sources).items():
+            logger.info("Loading %s promotions from %s", name, source.value)
+            yield from source.load()(source.value)
+    return itertools.islice(games(), args.limit)
+
+
+def stream(args, out=None):
+    """Write one NDJSON record per game to out (stdout), flushing after each record."""
+    out = out or sys.stdout
+    try:
+        for game in iter_games(args):
+            out.write(json.dumps(game.to_dict(), ensure_ascii=False) + "\n")
+            out.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`). Point stdout at devnull so the
+        # interpreter's final flush doesn't raise again, and exit quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def run(args):
+    destinations = registry.enabled_destinations()
+    destination_options = {
+        "discord": {"digest": True, "top": args.top} if args.digest else {},
+    }
 
     db = None
-    if os.getenv("MONGODB_URI"):
-        print("Using MongoDB", os.getenv("MONGODB_URI"))
-        from databases.mongodb import MongoDB
-        db = MongoDB()
-    
-    games = Games()
-
-    if epic_games_url:
-        logging.info("Loading Epic Games promotions from %s", epic_games_url)
-        from sources.epic_games import get_epic_games_promotions
-        games.add(get_epic_games_promotions(epic_games_url))
-
-    if steam_games_url:
-        logging.info("Loading Steam promotions from %s", steam_games_url)
-        from sources.steam import load_promoted_games
-        games.add(load_promoted_games(steam_games_url))
-
-    # Add more sources here
-    
-    if games:
-        # Print to console
-        if games.count == 0:
+    if registry.DATABASE.enabled:
+        print("Using MongoDB", registry.DATABASE.value)
+        db = registry.DATABASE.load()()
+
+    try:
+        games = Games()
+
+        games.add(iter_games(args))
+
+        if games:
+            # Print to console
+            if games.count == 0:
+                print("No games found")
+                return
+
+            discounted = games.discounted_more_than(50)
+            discounted.sort(key=lambda x: x.discount_percentage, reverse=True)
+            print(len(discounted), "Discounted")
+            for game in discounted:
+                print(game)
+
+            free = games.free
+            print(len(free), "Free")
+            for game in free:
+                print(game)
+
+            image_cache = None
+            if destinations and args.validate_images:
+                from destinations.images import ImageValidationCache
+                image_cache = ImageValidationCache()
+
+            for name, destination in destinations.items():
+                print(f"Sending to {name}", registry.targets(destination))
+                games_to_send = free + discounted
+
+                if db:
+                    filtered_games = []
+                    for game in games_to_send:
+                        game_id = getattr(game, 'id', game.title)
+                        valid_until = getattr(game, 'valid_until', '')
+                        if not db.is_game_posted(game_id, valid_until, name):
+                            filtered_games.append(game)
+                    games_to_send = filtered_games
+
+                # Only check images of games that are about to be posted
+                if image_cache:
+                    image_cache.validate_games(games_to_send)
+
+                # Destinations return the games they actually sent (e.g. a digest may leave
+                # some out); only those are marked as posted.
+                send = destination.load()
+                sent = {}
+                for target in registry.targets(destination):
+                    for game in send(target, games_to_send, **destination_options.get(name, {})) or []:
+                        sent[id(game)] = game
+
+                if db:
+                    for game in sent.values():
+                        db.mark_game_as_posted(
+                            getattr(game, 'id', game.title),
+                            game.title,
+                            getattr(game, 'valid_until', ''),
+                            name,
+                            getattr(game, 'original_price', None),
+                            getattr(game, 'price', None)
+                        )
+        else:
             print("No games found")
-            return
-        
-        discounted = games.discounted_more_than(50)
-        discounted.sort(key=lambda x: x.discount_percentage, reverse=True)
-        print(len(discounted), "Discounted")
-        for game in discounted:
-            print(game)
-
-        free = games.free
-        print(len(free), "Free")
-        for game in free:
-            print(game)
-        
-        # Send to Discord
-        if discord_webhooks and len(discord_webhooks) > 0:
-            print("Sending to Discord", discord_webhooks)
-            games_to_send = free + discounted
-            
-            if db: 
-                filtered_games = []
-                for game in games_to_send:
-                    game_id = getattr(game, 'id', game.title)
-                    valid_until = getattr(game, 'valid_until', '')
-                    if not db.is_game_posted(game_id, valid_until, 'discord'):
-                        filtered_games.append(game)
-                games_to_send = filtered_games
-            
-            from destinations.discord import send_to_discord_webhook
-            for webhook in discord_webhooks:
-                send_to_discord_webhook(webhook, games_to_send)
-                
-            if db:
-                for game in games_to_send:
-                    db.mark_game_as_posted(
-                        getattr(game, 'id', game.title),
-                        game.title,
-                        getattr(game, 'valid_until', ''),
-                        "discord",
-                        getattr(game, 'original_price', None),
-                        getattr(game, 'price', None)
-                    )
-
-        # Add more destinations here
-    else:
-        print("No games found")
+    finally:
+        if db:
+            db.compact_expired()
 
 if __name__ == "__main__":
     logging.basicConfig(
         level=logging.DEBUG,
         format="%(asctime)s %(levelname)s %(name)s %(message)s"
     )
-    main()
+    sys.exit(main())
@@ -19,6 +19,7 @@ class Game:
         self.valid_until = ""
         self.source = ""
         self.image_url = ""
+        self.image_candidates = []  # Fallback image URLs, best first
         self._posted = False  # Track if this game has been posted
         self.currency = ""
         self.free_to_play = False
@@ -92,6 +93,24 @@ class Game:
     def id(self):
         return self.url
     
+    def to_dict(self) -> dict:
+        """Return a machine-readable record with numeric prices and ISO8601 dates."""
+        return {
+            "id": self.id,
+            "store": self.store,
+            "source": self.source,
+            "title": self.title,
+            "url": self.url,
+            "image_url": self.image_url,
+            "currency": self.currency,
+            "price": self.price,
+            "original_price": self.original_price,
+            "discount_percentage": self.discount_percentage,
+            "is_free": self.is_free,
+            "free_to_play": self.free_to_play,
+            "valid_until": self.valid_until or None,
+        }
+
     def __repr__(self):
         return f"Game: '{self.title}'"
     
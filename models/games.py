@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterable, List
 from models.game import Game
 
 # Model for a list of games
@@ -6,7 +6,7 @@ class Games:
     def __init__(self):
         self.games: List[Game] = []
     
-    def add(self, games: List[Game]):
+    def add(self, games: Iterable[Game]):
         self.games.extend(games)
     
     def __repr__(self):
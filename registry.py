@@ -0,0 +1,77 @@
+"""
+Registry of sources, destinations and databases.
+
+Each entry names the environment variable that enables it and where its
+implementation lives. Modules are only imported once an entry is enabled,
+so a run that only checks Steam never pays for jmespath, pymongo and friends.
+"""
+import importlib
+import os
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+
+class Entry(NamedTuple):
+    env: str  # Environment variable that enables this entry
+    module: str  # Module holding the implementation
+    attr: str  # Function or class to use from the module
+
+    @property
+    def value(self) -> str:
+        return os.getenv(self.env) or ""
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.value)
+
+    def load(self) -> Callable:
+        """Import the implementing module and return the registered attribute."""
+        return getattr(importlib.import_module(self.module), self.attr)
+
+
+# Sources take a URL and return a list of Game objects
+SOURCES: Dict[str, Entry] = {
+    "epic_games": Entry("EPIC_GAMES_PROMOTIONS", "sources.epic_games", "get_epic_games_promotions"),
+    "steam": Entry("STEAM_PROMOTIONS", "sources.steam", "load_promoted_games"),
+    # Add more sources here
+}
+
+# Destinations take a target (e.g. webhook URL) and a list of Game objects
+DESTINATIONS: Dict[str, Entry] = {
+    "discord": Entry("DISCORD_WEBHOOK_URL", "destinations.discord", "send_to_discord_webhook"),
+    # Add more destinations here
+}
+
+DATABASE = Entry("MONGODB_URI", "databases.mongodb", "MongoDB")
+
+
+def enabled_sources(names: Optional[Iterable[str]] = None) -> Dict[str, Entry]:
+    """Return the enabled sources, optionally restricted to the given names."""
+    names = set(names) if names is not None else set(SOURCES)
+    unknown = names - set(SOURCES)
+    if unknown:
+        raise ValueError(f"Unknown source(s): {', '.join(sorted(unknown))}")
+    return {name: entry for name, entry in SOURCES.items() if name in names and entry.enabled}
+
+
+def enabled_destinations() -> Dict[str, Entry]:
+    """Return the enabled destinations."""
+    return {name: entry for name, entry in DESTINATIONS.items() if entry.enabled}
+
+
+def targets(entry: Entry) -> List[str]:
+    """Split a destination's configuration into its targets (semicolon-separated)."""
+    return [e for e in entry.value.split(";") if len(e) > 0]
+
+
+def import_enabled(names: Optional[Iterable[str]] = None) -> None:
+    """Import everything the current configuration would use, without running it."""
+    importlib.import_module("dotenv")
+    if os.getenv("SENTRY_DSN"):
+        importlib.import_module("sentry_sdk")
+        importlib.import_module("sentry_sdk.crons")
+    for entry in enabled_sources(names).values():
+        entry.load()
+    for entry in enabled_destinations().values():
+        entry.load()
+    if DATABASE.enabled:
+        DATABASE.load()
@@ -1,9 +1,10 @@
-from typing import List, Dict, Any
+from typing import Iterator, Dict, Any
+import os
 import requests
 import jmespath
 from datetime import datetime
 from models.game import Game
-import sentry_sdk
+from sources.images import rank_key_images
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,7 +12,7 @@ logger = logging.getLogger(__name__)
 icon = "https://cdn.iconscout.com/icon/premium/png-512-thumb/epic-games-7521453-7197026.png"
 store = "Epic"
 
-def get_epic_games_promotions(json_url: str) -> List[Game]:
+def get_epic_games_promotions(json_url: str) -> Iterator[Game]:
     """
     Fetches and processes free games from the Epic Games Store API.
     
@@ -19,7 +20,7 @@ def get_epic_games_promotions(json_url: str) -> List[Game]:
         json_url: URL to the Epic Games promotions API endpoint
         
     Returns:
-        List[Game]: A list of Game objects representing the free games
+        Iterator[Game]: Game objects representing the free games, yielded as they are parsed
     """
     try:
         # Make the API request
@@ -33,7 +34,6 @@ def get_epic_games_promotions(json_url: str) -> List[Game]:
         # Get all games
         all_games = jmespath.search('data.Catalog.searchStore.elements', data) or []
         
-        games = []
         for game_data in all_games:
             # Check if the game has any promotions
             promotions = jmespath.search('promotions', game_data) or {}
@@ -74,32 +74,8 @@ def get_epic_games_promotions(json_url: str) -> List[Game]:
             discount_price = str(price_data.get('discountPrice', 0) / 100) if price_data.get('discountPrice') is not None else ''
             
             # Get image - prefer Thumbnail, fall back to other non-Vault images
-            key_images = jmespath.search('keyImages', game_data) or []
-            thumbnail_url = ''
-            
-            # First try to find a Thumbnail
-            for img in key_images:
-                if img.get('type') == 'Thumbnail' and 'vault' not in img.get('url', '').lower():
-                    thumbnail_url = img.get('url', '')
-                    break
-            
-            # If no Thumbnail found, try other non-Vault image types (in order of preference)
-            if not thumbnail_url:
-                preferred_types = ['OfferImageWide', 'OfferImageTall', 'DieselStoreFrontWide', 'DieselStoreFrontTall']
-                for img_type in preferred_types:
-                    for img in key_images:
-                        if img.get('type') == img_type and 'vault' not in img.get('url', '').lower():
-                            thumbnail_url = img.get('url', '')
-                            break
-                    if thumbnail_url:
-                        break
-                        
-                # If still no image, try any non-Vault image
-                if not thumbnail_url:
-                    for img in key_images:
-                        if 'vault' not in img.get('url', '').lower():
-                            thumbnail_url = img.get('url', '')
-                            break
+            image_candidates = rank_key_images(jmespath.search('keyImages', game_data) or [])
+            thumbnail_url = image_candidates[0] if image_candidates else ''
             
             # Get categories
             categories = [cat.get('path', '') for cat in jmespath.search('categories', game_data) or []]
@@ -112,6 +88,7 @@ def get_epic_games_promotions(json_url: str) -> List[Game]:
             game.description = description
             game.url = url
             game.image_url = thumbnail_url
+            game.image_candidates = image_candidates
             game.source = 'epic_games'
             game.categories = categories
             
@@ -143,11 +120,10 @@ def get_epic_games_promotions(json_url: str) -> List[Game]:
                 game._discount_percentage = '0'
                 game.valid_until = ''
             
-            games.append(game)
-        
-        return games
+            yield game
         
     except Exception as e:
         logger.error(f"Error fetching Epic Games promotions: {e}")
-        sentry_sdk.capture_exception(e)
-        return []
\ No newline at end of file
+        if os.getenv("SENTRY_DSN"):
+            import sentry_sdk
+            sentry_sdk.capture_exception(e)
\ No newline at end of file
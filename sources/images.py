@@ -0,0 +1,28 @@
+"""
+Image selection for game thumbnails.
+"""
+from typing import Dict, Iterable, List
+
+# Key image types in order of preference; other types are used as a last resort
+PREFERRED_TYPES = ['Thumbnail', 'OfferImageWide', 'OfferImageTall', 'DieselStoreFrontWide', 'DieselStoreFrontTall']
+_RANK = {image_type: rank for rank, image_type in enumerate(PREFERRED_TYPES)}
+
+
+def rank_key_images(key_images: Iterable[Dict]) -> List[str]:
+    """
+    Rank Epic key images in a single pass.
+
+    Vault images are skipped, preferred types come first (in PREFERRED_TYPES order),
+    and remaining images keep their original order.
+
+    Returns:
+        List[str]: Image URLs, best first
+    """
+    ranked = []
+    for position, img in enumerate(key_images):
+        url = img.get('url', '')
+        if not url or 'vault' in url.lower():
+            continue
+        ranked.append((_RANK.get(img.get('type'), len(PREFERRED_TYPES)), position, url))
+    ranked.sort()
+    return [url for _, _, url in ranked]
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterator
 from datetime import datetime
 from models.game import Game
 from models.games import Games
@@ -9,21 +9,20 @@ import requests
 icon = "https://steamcommunity.com/favicon.ico"
 store = "Steam"
 
-def load_promoted_games(featured_url: str = "https://store.steampowered.com/api/featuredcategories") -> List[Game]:
+def load_promoted_games(featured_url: str = "https://store.steampowered.com/api/featuredcategories") -> Iterator[Game]:
     response = requests.get(featured_url)
     return parse_steam_promoted_games(response.text)
 
-def parse_steam_promoted_games(data: str) -> List[Game]:
+def parse_steam_promoted_games(data: str) -> Iterator[Game]:
     """
-    Fetches and processes promoted games from the Steam featured_url API.
+    Processes promoted games from the Steam featured_url API response.
     Args:
-        featured_url: URL to the Steam featured_url endpoint
+        data: JSON response body from the Steam featured_url endpoint
     Returns:
-        List[Game]: A list of Game objects representing the promoted games
+        Iterator[Game]: Game objects representing the promoted games, yielded as they are parsed
     """
     json_data = json.loads(data)
     
-    games: List[Game] = []
     # The response is a dict with keys like '0', '1', ..., 'coming_soon', etc.
     for key, section in json_data.items():
         if not isinstance(section, dict) or 'items' not in section or key.isdigit():
@@ -61,8 +60,7 @@ def parse_steam_promoted_games(data: str) -> List[Game]:
                     game.valid_until = dt.isoformat()  # e.g. '2025-05-25T17:00:00+00:00'
                 except Exception:
                     game.valid_until = ''
-            games.append(game)
-    return games
+            yield game
 
 if __name__ == "__main__":
     # read sample file